@@ -15,22 +15,32 @@
 # Users will interactively click on a map to drop a marker and log catches by position
 
 import streamlit as st
+import streamlit.components.v1 as components
+import numpy as np
 import pandas as pd
+import copy
+import os
+import threading
+import uuid
+import orjson
 import requests
-from datetime import datetime, timedelta
-import pytz
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime, time
+from pathlib import Path
 import streamlit_folium as st_folium
 import folium
-from geopy.distance import geodesic
+from folium.plugins import FastMarkerCluster
 
 # --- Settings ---
-LOCATIONS = {
+DEFAULT_LOCATIONS = {
     "113 Bridge": {
         "coordinates": (43.139, -89.387),
         "sub_locations": ["Below Bridge", "Above Bridge", "Pool Between Bridges"],
         "parking": [(43.1392, -89.3875), (43.1388, -89.3862)]
     }
 }
+LOCATIONS_PATH = Path(__file__).with_name("locations.json")
 USGS_STATION = {
     "05427850": {
         "name": "Yahara River at State Highway 113 at Madison, WI",
@@ -38,93 +48,164 @@ USGS_STATION = {
         "site_id": "05427850"
     }
 }
+USGS_SITE_IDS = tuple(USGS_STATION)
+USGS_STATION_COORDS = np.array([USGS_STATION[site_id]["coordinates"] for site_id in USGS_SITE_IDS])
+EARTH_RADIUS_M = 6371000.0
 PARAMS = {
     "00060": "Flow (cfs)",
     "00065": "Gage Height (ft)",
     "00010": "Water Temperature (°C)"
 }
 
+# Client-side marker builder for FastMarkerCluster rows of [lat, lon, popup]
+FISH_MARKER_CALLBACK = """
+function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: 'fish', prefix: 'fa', markerColor: 'blue'});
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+    marker.bindPopup(row[2]);
+    return marker;
+}
+"""
+
+# Fish log columns with explicit Arrow-backed dtypes, so frames skip per-call type inference
+FISH_DTYPES = {
+    "Date": "string[pyarrow]",
+    "Time": "string[pyarrow]",
+    "Location Name": "string[pyarrow]",
+    "Latitude": "double[pyarrow]",
+    "Longitude": "double[pyarrow]",
+    "Fish Type": "string[pyarrow]",
+    "Length (in)": "double[pyarrow]",
+    "Weight (lb)": "double[pyarrow]",
+    "Water Depth (ft)": "double[pyarrow]",
+    "Fish Depth (ft)": "double[pyarrow]",
+    "Bait Used": "string[pyarrow]",
+    "Rigging": "string[pyarrow]",
+    "Water Type": "string[pyarrow]",
+    "Position": "string[pyarrow]",
+    "Success Score (1–10)": "int64[pyarrow]",
+    "Notes": "string[pyarrow]"
+}
+FISH_COLUMNS = tuple(FISH_DTYPES)
+
 # --- Data Models ---
 
+# Normalize ISO date strings and st.date_input dates to datetimes
+def _as_datetime(value):
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, time.min)
+
+# "YYYY-MM-DD hh:mm AM/PM" in a single f-string, avoiding strftime's format interpreter
+def _format_timestamp(dt):
+    return f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d} {dt.hour % 12 or 12:02d}:{dt.minute:02d} {'AM' if dt.hour < 12 else 'PM'}"
+
 # Each outing represents a fishing session
 class Outing:
     def __init__(self, location_name, start_time, end_time=None, success_score=None, notes=""):
-        if isinstance(start_time, str):
-            start_time = datetime.strptime(start_time, "%Y-%m-%d")
-        if isinstance(end_time, str) and end_time:
-            end_time = datetime.strptime(end_time, "%Y-%m-%d")
-
+        self.outing_id = uuid.uuid4().hex
         self.location_name = location_name
-        self.start_time = start_time
-        self.end_time = end_time
+        self.start_time = _as_datetime(start_time)
+        self.end_time = _as_datetime(end_time) if end_time else None
         self.success_score = success_score
         self.notes = notes
-        self.fish_caught = []  # list of fish dictionaries
+        self._fish_caught = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in FISH_DTYPES.items()})
+        self._pending_fish = []  # FISH_COLUMNS-ordered tuples logged since the last fish_frame() call
 
     def add_fish(self, fish_data):
-        self.fish_caught.append(fish_data)
+        self._pending_fish.append(fish_data)
 
     def to_dict(self):
         return {
             "Location Name": self.location_name,
-            "Start Time": self.start_time.strftime("%Y-%m-%d %I:%M %p"),
-            "End Time": self.end_time.strftime("%Y-%m-%d %I:%M %p") if self.end_time else None,
+            "Start Time": _format_timestamp(self.start_time),
+            "End Time": _format_timestamp(self.end_time) if self.end_time else None,
             "Success Score (1–10)": self.success_score,
             "Notes": self.notes,
-            "Fish Caught": self.fish_caught
+            "Fish Caught": len(self.fish_frame())
         }
 
+    # Per-fish details as a columnar, Arrow-backed table; pending rows are folded in once on read
+    def fish_frame(self):
+        if self._pending_fish:
+            new_rows = pd.DataFrame(self._pending_fish, columns=list(FISH_COLUMNS)).astype(FISH_DTYPES)
+            if self._fish_caught.empty:
+                self._fish_caught = new_rows
+            else:
+                self._fish_caught = pd.concat([self._fish_caught, new_rows], ignore_index=True)
+            self._pending_fish = []
+        return self._fish_caught
+
 # --- Sidebar Navigation ---
 menu = st.sidebar.radio("Navigation", ["Log a Catch", "View Catch Log", "Manage Locations", "Settings"])
 
-# Fetch current gage height from USGS API
+# Shared HTTP session so repeat API calls reuse pooled keep-alive connections
+@st.cache_resource
+def get_http_session():
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=3, connect=1, read=0, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+    ))
+    return session
+
+# Great-circle distance in meters; works on scalars or broadcast NumPy arrays
+def haversine_m(lat1, lon1, lat2, lon2):
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    dlat = lat2 - lat1
+    dlon = np.radians(lon2) - np.radians(lon1)
+    a = np.sin(dlat * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon * 0.5) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+# Gage readings update roughly every 15 minutes, so memoize the network fetch.
+# One request covers every site; failures raise out of here and are therefore never cached.
+@st.cache_data(ttl=900, show_spinner=False)
+def _fetch_usgs_gage_heights_cached(site_ids):
+    url = f"https://waterservices.usgs.gov/nwis/iv/?format=json&sites={','.join(site_ids)}&parameterCd=00065&siteStatus=all"
+    response = get_http_session().get(url, timeout=(3.05, 5))
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+    heights = {}
+    for series in data['value']['timeSeries']:
+        site_id = series['sourceInfo']['siteCode'][0]['value']
+        heights[site_id] = float(series['values'][0]['value'][0]['value'])
+    return heights
+
+# Fetch current gage height from USGS API (served from the batched all-station request).
+# Returns (height, ok); ok is False when the 8.0 ft fallback was used.
 def fetch_usgs_gage_height(site_id):
     try:
-        url = f"https://waterservices.usgs.gov/nwis/iv/?format=json&sites={site_id}&parameterCd=00065&siteStatus=all"
-        response = requests.get(url)
-        data = response.json()
-        value = data['value']['timeSeries'][0]['values'][0]['value'][0]['value']
-        return float(value)
+        return _fetch_usgs_gage_heights_cached(USGS_SITE_IDS)[site_id], True
     except Exception as e:
         st.warning(f"Could not fetch gage height: {e}")
-        return 8.0
+        return 8.0, False
 
-# Improved depth estimation using tighter distance scaling and unique coordinate-based variability
+# Inverse-distance-weighted blend of station gage heights at a point (distances floored at 1 m)
+def _depth_kernel(lat, lon, station_lats, station_lons, station_vals):
+    distances = haversine_m(lat, lon, station_lats, station_lons)
+    weights = 1.0 / np.maximum(distances, 1.0) ** 2
+    return float(np.dot(weights, station_vals) / weights.sum())
+
+# Improved depth estimation using tighter distance scaling and unique coordinate-based variability.
+# Returns (depth, ok); ok is False if any station fell back to the default gage height.
 def estimate_depth_from_combined_sources(lat, lon):
-    station_data = USGS_STATION["05427850"]
-    gage_depth = fetch_usgs_gage_height(station_data["site_id"])
+    readings = [fetch_usgs_gage_height(site_id) for site_id in USGS_SITE_IDS]
+    gage_depths = np.array([height for height, _ in readings])
+    gage_depth = _depth_kernel(lat, lon, USGS_STATION_COORDS[:, 0], USGS_STATION_COORDS[:, 1], gage_depths)
     base_variation = ((lat * 1000) % 7 + (lon * 1000) % 3) / 10.0  # adds variability
-    return round(gage_depth + base_variation, 1)
-
-# --- Outing Management ---
-if 'past_outings' not in st.session_state:
-    st.session_state['past_outings'] = []
-if 'current_outing' not in st.session_state:
-    st.session_state['current_outing'] = None
-
-if menu == "Log a Catch":
-    st.sidebar.subheader("🎣 Start New Outing")
-    with st.sidebar.expander("New Outing Details"):
-        outing_location = st.selectbox("Location:", list(LOCATIONS.keys()), key="outing_location")
-        outing_start = st.date_input("Start Date")
-        outing_end = st.date_input("End Date")
-        outing_score = st.slider("Success Score (1–10)", 1, 10, 7)
-        outing_notes = st.text_area("Outing Notes")
-        if st.button("Begin Outing"):
-            new_outing = Outing(
-            location_name=outing_location,
-            start_time=outing_start,
-            end_time=outing_end,
-            success_score=outing_score,
-            notes=outing_notes
-        )
-            st.session_state['current_outing'] = new_outing
-            st.session_state['past_outings'].append(new_outing)
-            st.success("🎣 New outing started!")
-    st.title("🎣 Log Fish by Map Location")
-    st.markdown("Click on the map to mark exactly where you caught each fish. You can log multiple fish with details for each.")
+    return round(gage_depth + base_variation, 1), all(ok for _, ok in readings)
 
-    m = folium.Map(location=[43.139, -89.387], zoom_start=15)
+# Base map with its tile layers, built once and shared across reruns and sessions.
+# Read-only: st_folium adds feature groups to whatever map it is given, so callers deep-copy it.
+# The Figure-level render is done here so copies can be passed with render=False; st_folium
+# still renders the map itself on every call.
+@st.cache_resource
+def base_catch_map():
+    m = folium.Map(location=[43.139, -89.387], zoom_start=15, prefer_canvas=True)
     folium.TileLayer("Esri.WorldImagery", name="Satellite").add_to(m)
     folium.TileLayer(
         tiles="https://stamen-tiles.a.ssl.fastly.net/terrain/{z}/{x}/{y}.jpg",
@@ -133,28 +214,67 @@ if menu == "Log a Catch":
     ).add_to(m)
     folium.TileLayer("OpenSeaMap", name="Water Depth").add_to(m)
     folium.LayerControl().add_to(m)
+    m.get_root().render()
+    return m
+
+# Read-only outing map rendered to static HTML; re-rendered only when the outing gains fish
+@st.cache_data(max_entries=64, show_spinner=False)
+def outing_map_html(outing_id, fish_count, _df):
+    lats = _df['Latitude'].to_numpy(dtype=float)
+    lons = _df['Longitude'].to_numpy(dtype=float)
+    m = folium.Map(location=[float(lats.mean()), float(lons.mean())], zoom_start=14)
+    popups = ("<b>" + _df['Fish Type'] + "</b> (" + _df['Length (in)'].astype(str) + '")').to_numpy()
+    FastMarkerCluster(
+        _df[['Latitude', 'Longitude']].assign(Popup=popups),
+        callback=FISH_MARKER_CALLBACK
+    ).add_to(m)
+    return m.get_root().render()
+
+# Parse "lat,lon" lines into a list of (lat, lon) tuples, skipping lines without a comma
+def parse_parking(text):
+    lines = [line for line in text.splitlines() if "," in line]
+    if not lines:
+        return []
+    coords = np.loadtxt(lines, delimiter=",", ndmin=2)
+    if coords.shape[1] != 2:
+        raise ValueError("Parking locations must be one 'lat,lon' pair per line")
+    return [tuple(pair) for pair in coords.tolist()]
 
+# Map, click handling and catch form; pan/zoom/click reruns only this block, not the whole page
+@st.fragment
+def catch_map_fragment():
+    m = copy.deepcopy(base_catch_map())
+
+    # The catch marker lives in its own layer; st_folium attaches it to this rerun's copy only
     clicked = None
+    catch_marker = folium.FeatureGroup(name="Selected Catch")
     if 'last_clicked_coords' in st.session_state:
         folium.Marker(
             location=st.session_state['last_clicked_coords'],
             popup="Selected Catch Location",
             icon=folium.Icon(color='red', icon='info-sign')
-        ).add_to(m)
-    clicked = st_folium.st_folium(m, width=700, height=500)
+        ).add_to(catch_marker)
+    clicked = st_folium.st_folium(m, feature_group_to_add=catch_marker, render=False, width=700, height=500, returned_objects=["last_clicked"])
 
     if isinstance(clicked, dict) and isinstance(clicked.get("last_clicked"), dict):
         latlng = clicked["last_clicked"]
         lat = latlng.get("lat")
         lon = latlng.get("lng")
         if lat is not None and lon is not None:
+            # Pan/zoom reruns return the same click; reuse its depth unless it was built on the
+            # fallback gage height, which is re-fetched (and warned about) on every rerun instead
             st.session_state['last_clicked_coords'] = (lat, lon)
-            estimated_depth = estimate_depth_from_combined_sources(lat, lon)
+            cached_depth = st.session_state.get('estimated_depth')
+            if cached_depth is not None and cached_depth[0] == (lat, lon):
+                estimated_depth = cached_depth[1]
+            else:
+                estimated_depth, gage_ok = estimate_depth_from_combined_sources(lat, lon)
+                st.session_state['estimated_depth'] = ((lat, lon), estimated_depth) if gage_ok else None
             st.success(f"📍 Catch location set at: ({lat:.5f}, {lon:.5f})")
             st.info(f"Estimated Water Depth at this point: **{estimated_depth} ft**\n\nBased on USGS gage reading with location-based adjustment.")
 
             with st.form("fish_log_form"):
-                loc_name = st.selectbox("Location Name:", list(LOCATIONS.keys()))
+                loc_name = st.selectbox("Location Name:", LOCATION_KEYS)
                 water_type = st.selectbox("Water Type:", ["Channel", "Near Channel", "Slack"])
                 position = st.selectbox("Position in Water Body:", ["Shore", "Transition", "Middle"])
                 depth = st.number_input("Water Depth (ft):", 0.0, 50.0, value=estimated_depth)
@@ -170,27 +290,108 @@ if menu == "Log a Catch":
 
                 if submitted and st.session_state['current_outing'] is not None:
                     now = datetime.now()
-                    new_fish_entry = {
-                        "Date": now.strftime("%Y-%m-%d"),
-                        "Time": now.strftime("%I:%M %p"),
-                        "Location Name": loc_name,
-                        "Latitude": lat,
-                        "Longitude": lon,
-                        "Fish Type": fish_type,
-                        "Length (in)": length,
-                        "Weight (lb)": weight,
-                        "Water Depth (ft)": depth,
-                        "Fish Depth (ft)": fish_depth,
-                        "Bait Used": bait,
-                        "Rigging": rigging,
-                        "Water Type": water_type,
-                        "Position": position,
-                        "Success Score (1–10)": score,
-                        "Notes": notes
-                    }
-                    st.session_state['current_outing'].add_fish(new_fish_entry)
+                    fish_row = (
+                        now.strftime("%Y-%m-%d"), now.strftime("%I:%M %p"), loc_name, lat, lon,
+                        fish_type, length, weight, depth, fish_depth, bait, rigging,
+                        water_type, position, score, notes
+                    )
+                    st.session_state['current_outing'].add_fish(fish_row)
                     st.success("✅ Fish entry logged!")
 
+# Read saved locations from disk; None when nothing has been saved yet (raises on a corrupt file)
+def _read_locations_file():
+    if not LOCATIONS_PATH.exists():
+        return None
+    # JSON has no tuples; restore the (lat, lon) tuples used by DEFAULT_LOCATIONS and the forms
+    return {
+        name: {
+            **entry,
+            "coordinates": tuple(entry["coordinates"]),
+            "parking": [tuple(pair) for pair in entry["parking"]]
+        }
+        for name, entry in orjson.loads(LOCATIONS_PATH.read_bytes()).items()
+    }
+
+# Write via a temp file and os.replace so a crash mid-write never leaves a truncated file
+def _write_locations_file(locations):
+    tmp_path = LOCATIONS_PATH.with_name(LOCATIONS_PATH.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(locations))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, LOCATIONS_PATH)
+
+# Saved locations, read from disk once and shared by new sessions (built-in defaults until first save)
+@st.cache_resource
+def load_locations():
+    locations = _read_locations_file()
+    return DEFAULT_LOCATIONS if locations is None else locations
+
+# Serializes read-merge-write cycles on the locations file across sessions
+@st.cache_resource
+def _locations_lock():
+    return threading.Lock()
+
+# Apply one change to the saved locations and persist it. The change is merged into the current
+# file contents rather than this session's copy, so locations saved by other sessions are kept.
+def save_location_change(remove=None, add=None):
+    with _locations_lock():
+        try:
+            locations = _read_locations_file()
+        except (ValueError, KeyError, TypeError):
+            locations = None  # unreadable file: rebuild it from this session's copy
+        if locations is None:
+            locations = copy.deepcopy(st.session_state['locations'])
+        if remove is not None:
+            locations.pop(remove, None)
+        if add is not None:
+            name, entry = add
+            locations[name] = entry
+        _write_locations_file(locations)
+    load_locations.clear()
+    st.session_state['locations'].clear()
+    st.session_state['locations'].update(locations)
+
+# --- Outing Management ---
+if 'past_outings' not in st.session_state:
+    st.session_state['past_outings'] = []
+if 'current_outing' not in st.session_state:
+    st.session_state['current_outing'] = None
+
+# Locations live in session state so edits survive Streamlit reruns
+if 'locations' not in st.session_state:
+    try:
+        st.session_state['locations'] = copy.deepcopy(load_locations())
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        st.warning(f"Could not read saved locations, using defaults: {e}")
+        st.session_state['locations'] = copy.deepcopy(DEFAULT_LOCATIONS)
+LOCATIONS = st.session_state['locations']
+LOCATION_KEYS = tuple(LOCATIONS)
+
+if menu == "Log a Catch":
+    st.sidebar.subheader("🎣 Start New Outing")
+    with st.sidebar.expander("New Outing Details"):
+        outing_location = st.selectbox("Location:", LOCATION_KEYS, key="outing_location")
+        outing_start = st.date_input("Start Date")
+        outing_end = st.date_input("End Date")
+        outing_score = st.slider("Success Score (1–10)", 1, 10, 7)
+        outing_notes = st.text_area("Outing Notes")
+        if st.button("Begin Outing"):
+            new_outing = Outing(
+            location_name=outing_location,
+            start_time=outing_start,
+            end_time=outing_end,
+            success_score=outing_score,
+            notes=outing_notes
+        )
+            st.session_state['current_outing'] = new_outing
+            st.session_state['past_outings'].append(new_outing)
+            st.success("🎣 New outing started!")
+    st.title("🎣 Log Fish by Map Location")
+    st.markdown("Click on the map to mark exactly where you caught each fish. You can log multiple fish with details for each.")
+
+    catch_map_fragment()
+
 if menu == "View Catch Log":
     st.title("📄 Logged Catches")
     if st.session_state.get("past_outings"):
@@ -201,17 +402,10 @@ if menu == "View Catch Log":
                 st.markdown(f"**Score:** {outing.success_score}")
                 st.markdown(f"**Notes:** {outing.notes}")
 
-                if outing.fish_caught:
-                    df = pd.DataFrame(outing.fish_caught)
+                df = outing.fish_frame()
+                if not df.empty:
                     st.dataframe(df, use_container_width=True)
-                    m = folium.Map(location=[df['Latitude'].mean(), df['Longitude'].mean()], zoom_start=14)
-                    for _, row in df.iterrows():
-                        folium.Marker(
-                            [row['Latitude'], row['Longitude']],
-                            popup=f"{row['Fish Type']} ({row['Length (in)']}\")",
-                            icon=folium.Icon(color='blue', icon='fish', prefix='fa')
-                        ).add_to(m)
-                    st_folium.st_folium(m, width=700, height=400)
+                    components.html(outing_map_html(outing.outing_id, len(df), df), width=700, height=400)
                 else:
                     st.info("No fish recorded for this outing.")
     else:
@@ -221,50 +415,58 @@ if menu == "View Catch Log":
 if menu == "Manage Locations":
     st.title("📍 Manage Locations")
 
-    selected = st.selectbox("Edit Existing Location", ["Add New"] + list(LOCATIONS.keys()))
+    selected = st.selectbox("Edit Existing Location", ("Add New",) + LOCATION_KEYS)
 
     if selected != "Add New":
         loc_data = LOCATIONS[selected]
-        new_name = st.text_input("Location Name", selected)
-        coords = st.text_input("Coordinates (lat, lon)", f"{loc_data['coordinates'][0]}, {loc_data['coordinates'][1]}")
-        subs = st.text_input("Sub-locations (comma-separated)", ", ".join(loc_data['sub_locations']))
-        parks = st.text_area("Parking Locations (lat,lon per line)", ", ".join([f"{lat},{lon}" for lat, lon in loc_data['parking']]))
+        with st.form("edit_location"):
+            new_name = st.text_input("Location Name", selected)
+            coords = st.text_input("Coordinates (lat, lon)", f"{loc_data['coordinates'][0]}, {loc_data['coordinates'][1]}")
+            subs = st.text_input("Sub-locations (comma-separated)", ", ".join(loc_data['sub_locations']))
+            parks = st.text_area("Parking Locations (lat,lon per line)", "\n".join(f"{lat},{lon}" for lat, lon in loc_data['parking']))
+            update_clicked = st.form_submit_button("Update Location")
+            delete_clicked = st.form_submit_button("Delete Location")
 
-        if st.button("Update Location"):
+        if update_clicked:
             try:
                 lat, lon = map(float, coords.split(","))
                 sublist = [s.strip() for s in subs.split(",") if s.strip()]
-                parklist = [tuple(map(float, line.split(","))) for line in parks.splitlines() if "," in line]
-                LOCATIONS.pop(selected)
-                LOCATIONS[new_name] = {
+                parklist = parse_parking(parks)
+                save_location_change(remove=selected, add=(new_name, {
                     "coordinates": (lat, lon),
                     "sub_locations": sublist,
                     "parking": parklist
-                }
+                }))
                 st.success(f"Updated location '{new_name}'")
             except Exception as e:
                 st.error(f"Error updating location: {e}")
 
-        if st.button("Delete Location"):
-            LOCATIONS.pop(selected)
-            st.success(f"Deleted location '{selected}'")
+        if delete_clicked:
+            try:
+                save_location_change(remove=selected)
+                st.success(f"Deleted location '{selected}'")
+            except Exception as e:
+                st.error(f"Error deleting location: {e}")
 
     else:
         st.subheader("➕ Add New Location")
-        name = st.text_input("New Location Name")
-        coords = st.text_input("New Coordinates (lat, lon)")
-        subs = st.text_input("Sub-locations (comma-separated)")
-        parks = st.text_area("Parking Locations (lat,lon per line)")
-        if st.button("Add Location"):
+        with st.form("add_location"):
+            name = st.text_input("New Location Name")
+            coords = st.text_input("New Coordinates (lat, lon)")
+            subs = st.text_input("Sub-locations (comma-separated)")
+            parks = st.text_area("Parking Locations (lat,lon per line)")
+            add_clicked = st.form_submit_button("Add Location")
+
+        if add_clicked:
             try:
                 lat, lon = map(float, coords.split(","))
                 sublist = [s.strip() for s in subs.split(",") if s.strip()]
-                parklist = [tuple(map(float, line.split(","))) for line in parks.splitlines() if "," in line]
-                LOCATIONS[name] = {
+                parklist = parse_parking(parks)
+                save_location_change(add=(name, {
                     "coordinates": (lat, lon),
                     "sub_locations": sublist,
                     "parking": parklist
-                }
+                }))
                 st.success(f"Added location '{name}'")
             except Exception as e:
                 st.error(f"Error adding location: {e}")